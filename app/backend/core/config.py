@@ -13,8 +13,23 @@ class Settings(BaseSettings):
     # RAG Settings (Increased for better context retention)
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 150
+    # Lines found on at least this share of a document's pages are dropped as headers/footers
+    BOILERPLATE_PAGE_RATIO: float = 0.5
+    BOILERPLATE_MIN_PAGES: int = 3
+    BOILERPLATE_EDGE_LINES: int = 3  # Lines at the top and bottom of a page treated as header/footer candidates
     EMBEDDING_MODEL: str = "sentence-transformers/all-mpnet-base-v2"
     VECTOR_DB_K: int = 8
+    CONTEXT_SNIPPET_CHARS: int = 200  # Preview length when raw_context is returned lazily
+    
+    # An ingestion marker older than this (seconds) is treated as left by a crashed worker
+    INGESTION_MARKER_MAX_AGE: int = 3600
+    # How often (seconds) each worker checks for queued rebuilds left behind by a crashed worker
+    INGESTION_RECOVERY_INTERVAL: int = 30
+    
+    # Query trace capture (disabled when empty). "{pid}" gives each worker its own file.
+    QUERY_TRACE_PATH: str = ""
+    QUERY_TRACE_MAX_BYTES: int = 50 * 1024 * 1024
+    QUERY_TRACE_BACKUPS: int = 5
     
     # LLM Settings
     GOOGLE_API_KEY: str = ""  # Set via environment variable or .env file
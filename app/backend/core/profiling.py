@@ -0,0 +1,57 @@
+import time
+import importlib
+from contextlib import contextmanager
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StartupProfile:
+    """Records import and warmup timings so slow cold starts can be diagnosed."""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.status = "starting"
+        self.imports: Dict[str, float] = {}
+        self.stages: Dict[str, float] = {}
+        self.error: str = None
+
+    def record(self, stage: str, seconds: float):
+        self.stages[stage] = round(seconds, 3)
+
+    def since_start(self) -> float:
+        return time.perf_counter() - self._started
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed_import(self, module_name: str):
+        """Imports a module, recording its incremental (not-yet-cached) import time."""
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self.imports[module_name] = round(time.perf_counter() - start, 3)
+        return module
+
+    def report(self) -> dict:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "imports": self.imports,
+            "stages": self.stages,
+            "elapsed": round(self.since_start(), 3),
+        }
+
+    def log(self):
+        slowest = sorted(self.imports.items(), key=lambda kv: kv[1], reverse=True)
+        logger.info(f"Startup {self.status} in {self.since_start():.2f}s")
+        for name, seconds in self.stages.items():
+            logger.info(f"  stage  {name:<24} {seconds:7.3f}s")
+        for name, seconds in slowest:
+            logger.info(f"  import {name:<24} {seconds:7.3f}s")
+
+startup_profile = StartupProfile()
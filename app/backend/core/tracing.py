@@ -0,0 +1,57 @@
+import os
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+from app.backend.core.config import settings
+
+# Dedicated logger so trace lines never mix with application logs
+_trace_logger = logging.getLogger("query_trace")
+_trace_logger.propagate = False
+_trace_path = None
+
+def _configure(path: str):
+    global _trace_path
+    for handler in list(_trace_logger.handlers):
+        _trace_logger.removeHandler(handler)
+        handler.close()
+
+    parent = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(parent):
+        os.makedirs(parent, exist_ok=True)
+
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=settings.QUERY_TRACE_MAX_BYTES,
+        backupCount=settings.QUERY_TRACE_BACKUPS,
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _trace_logger.addHandler(handler)
+    _trace_logger.setLevel(logging.INFO)
+    _trace_path = path
+
+def tracing_enabled() -> bool:
+    return bool(settings.QUERY_TRACE_PATH)
+
+def write_trace(record: dict):
+    """Appends one compact JSON line to the rotating query trace, if enabled."""
+    if not tracing_enabled():
+        return
+    path = settings.QUERY_TRACE_PATH.format(pid=os.getpid())
+    if path != _trace_path:
+        _configure(path)
+    _trace_logger.info(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+
+def read_trace(path: str) -> list:
+    """Loads trace records from a JSONL file, skipping malformed lines."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return sorted(records, key=lambda r: r.get("ts", 0))
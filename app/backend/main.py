@@ -1,5 +1,9 @@
+from app.backend.core.profiling import startup_profile
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.backend.core.config import settings
 from app.backend.routers import qa, admin
 import logging
@@ -8,7 +12,38 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title=settings.PROJECT_NAME)
+startup_profile.record("app_import", startup_profile.since_start())
+
+def warmup():
+    """Loads the model, LLM client and index after the server is already accepting requests."""
+    try:
+        qa.init_pipeline(startup_profile)
+        startup_profile.status = "ready"
+    except Exception as e:
+        logger.error(f"Failed to initialize RAG Pipeline: {e}")
+        # We don't raise here to allow app to start even if RAG fails (e.g. no index yet)
+        startup_profile.status = "failed"
+        startup_profile.error = str(e)
+    startup_profile.log()
+
+def ingestion_watchdog(stop: threading.Event):
+    """Periodically resumes queued rebuilds whose leader worker died mid-ingestion."""
+    while not stop.is_set():
+        try:
+            admin.recover_orphaned_ingestion()
+        except Exception as e:
+            logger.error(f"Ingestion recovery failed: {e}")
+        stop.wait(settings.INGESTION_RECOVERY_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=warmup, name="rag-warmup", daemon=True).start()
+    stop_watchdog = threading.Event()
+    threading.Thread(target=ingestion_watchdog, args=(stop_watchdog,), name="ingestion-watchdog", daemon=True).start()
+    yield
+    stop_watchdog.set()
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -27,6 +62,12 @@ app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness plus the startup profile (per-module import and model load times)."""
+    report = startup_profile.report()
+    return JSONResponse(status_code=200 if report["status"] == "ready" else 503, content=report)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -4,18 +4,34 @@ from typing import List, Optional
 # Request Models
 class QueryRequest(BaseModel):
     question: str
+    # When False, raw_context carries only chunk IDs and snippets; fetch full text via /chunks
+    include_context: bool = True
+
+class ChunkBatchRequest(BaseModel):
+    ids: List[str]
 
 # Response Models
 class Citation(BaseModel):
     doc_id: Optional[str] = None
     doc_name: str
     page: Optional[int] = None
+    page_end: Optional[int] = None
     score: float
 
 class RawContext(BaseModel):
+    chunk_id: Optional[str] = None
+    content: Optional[str] = None
+    snippet: Optional[str] = None
+    doc_name: str
+    page: Optional[int] = None
+    page_end: Optional[int] = None
+
+class Chunk(BaseModel):
+    chunk_id: str
     content: str
     doc_name: str
     page: Optional[int] = None
+    page_end: Optional[int] = None
 
 class QueryResponse(BaseModel):
     answer: str
@@ -1,7 +1,7 @@
 from typing import List, Protocol
 from app.backend.core.config import settings
-import openai
-from langchain_google_genai import ChatGoogleGenerativeAI
+
+# Provider SDKs are imported inside each client so only the selected one is loaded
 
 class LLMClient(Protocol):
     def generate(self, prompt: str) -> str:
@@ -9,6 +9,7 @@ class LLMClient(Protocol):
 
 class OpenAILLMClient:
     def __init__(self, api_key: str, base_url: str = None, model: str = "gpt-3.5-turbo"):
+        import openai
         self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
         self.model = model
 
@@ -28,6 +29,7 @@ class OpenAILLMClient:
 
 class GeminiLLMClient:
     def __init__(self, api_key: str = settings.GOOGLE_API_KEY, model: str = settings.LLM_MODEL):
+        from langchain_google_genai import ChatGoogleGenerativeAI
         self.llm = ChatGoogleGenerativeAI(
             model=model,
             google_api_key=api_key,
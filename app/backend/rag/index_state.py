@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import fcntl
+import socket
+from contextlib import contextmanager
+from app.backend.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Coordination files live next to INDEX_DIR (not inside it) so they survive
+# index rebuilds and are shared by every uvicorn worker on the same volume.
+def _lock_path() -> str:
+    return f"{settings.INDEX_DIR}.lock"
+
+def _generation_path() -> str:
+    return f"{settings.INDEX_DIR}.generation"
+
+def _pending_path() -> str:
+    return f"{settings.INDEX_DIR}.pending"
+
+def _ingesting_path() -> str:
+    return f"{settings.INDEX_DIR}.ingesting"
+
+def _ensure_parent():
+    parent = os.path.dirname(os.path.abspath(settings.INDEX_DIR))
+    if not os.path.exists(parent):
+        os.makedirs(parent, exist_ok=True)
+
+@contextmanager
+def index_lock(blocking: bool = True):
+    """Cross-process lock guarding INDEX_DIR.
+
+    Yields True when the lock is held, or False if `blocking` is off and
+    another worker (or thread) already holds it.
+    """
+    _ensure_parent()
+    fd = os.open(_lock_path(), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+def get_index_generation() -> int:
+    """Returns the on-disk index generation (0 if the index was never built)."""
+    try:
+        with open(_generation_path()) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def mark_index_updated():
+    """Advances the index generation. Callers must hold `index_lock`."""
+    _ensure_parent()
+    generation = get_index_generation() + 1
+    tmp_path = f"{_generation_path()}.tmp.{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        f.write(str(generation))
+    os.replace(tmp_path, _generation_path())
+    logger.info(f"Index generation advanced to {generation}")
+
+def request_ingestion():
+    """Records that the documents changed and the index must be rebuilt."""
+    _ensure_parent()
+    with open(_pending_path(), "a"):
+        pass
+    # Refresh the timestamp on repeat requests so the status age limit restarts
+    os.utime(_pending_path())
+
+def take_ingestion_request() -> bool:
+    """Consumes a pending rebuild request, returning whether one existed."""
+    try:
+        os.remove(_pending_path())
+        return True
+    except FileNotFoundError:
+        return False
+
+def has_ingestion_request() -> bool:
+    return os.path.exists(_pending_path())
+
+@contextmanager
+def ingestion_marker():
+    """Advertises a running rebuild to other workers. Callers must hold `index_lock`."""
+    _ensure_parent()
+    owner = {"pid": os.getpid(), "host": socket.gethostname(), "started_at": time.time()}
+    with open(_ingesting_path(), "w") as f:
+        json.dump(owner, f)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(_ingesting_path())
+        except FileNotFoundError:
+            pass
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _live_marker():
+    """The ingestion marker, or None if absent or left behind by a crashed worker."""
+    try:
+        with open(_ingesting_path()) as f:
+            owner = json.load(f)
+        started_at = float(owner["started_at"])
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+    if time.time() - started_at > settings.INGESTION_MARKER_MAX_AGE:
+        return None
+    # Liveness can only be checked for workers on this host; others rely on the age limit
+    if owner.get("host") == socket.gethostname() and not _pid_alive(int(owner.get("pid", 0))):
+        return None
+    return owner
+
+def has_orphaned_ingestion_request() -> bool:
+    """A queued rebuild that no live worker is processing (e.g. its leader crashed)."""
+    return has_ingestion_request() and _live_marker() is None
+
+def _fresh_pending_request() -> bool:
+    """A queued request that is not older than the marker age limit.
+
+    Orphaned requests are drained by the ingestion watchdog; until then, one that
+    has aged out is not reported so clients don't poll forever.
+    """
+    try:
+        age = time.time() - os.path.getmtime(_pending_path())
+    except FileNotFoundError:
+        return False
+    return age <= settings.INGESTION_MARKER_MAX_AGE
+
+def ingestion_status() -> dict:
+    """Cheap, lock-free snapshot of ingestion state for polling clients.
+
+    Never probes `index_lock`: briefly holding it could make a real ingestion
+    request think another worker will pick it up.
+    """
+    owner = _live_marker()
+    return {
+        "ingesting": owner is not None,
+        "pending": has_ingestion_request() if owner else _fresh_pending_request(),
+        "started_at": owner["started_at"] if owner else None,
+        "generation": get_index_generation(),
+    }
@@ -1,22 +1,30 @@
 import os
+import re
 import shutil
-import threading
-from typing import List
+import hashlib
+from collections import Counter
+from typing import Dict, List, Set
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain_chroma import Chroma
+from chromadb.api.shared_system_client import SharedSystemClient
 from langchain_core.documents import Document
 from app.backend.core.config import settings
+from app.backend.rag.index_state import (
+    index_lock,
+    mark_index_updated,
+    request_ingestion,
+    take_ingestion_request,
+    has_ingestion_request,
+    ingestion_marker,
+)
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global lock to prevent concurrent indexing which corrupts ChromaDB
-_ingestion_lock = threading.Lock()
-
 def load_documents(source_dir: str) -> List[Document]:
     """Loads all PDF documents from the source directory with better metadata tracking."""
     documents = []
@@ -42,61 +50,216 @@ def load_documents(source_dir: str) -> List[Document]:
                 logger.error(f"Error loading {filename}: {e}")
     return documents
 
+def make_chunk_id(chunk: Document) -> str:
+    """Content-addressed chunk ID, stable across re-ingestion of unchanged documents."""
+    key = "|".join([
+        str(chunk.metadata.get("source", "")),
+        str(chunk.metadata.get("page", "")),
+        str(chunk.metadata.get("page_end", "")),
+        str(chunk.metadata.get("start_index", "")),
+        chunk.page_content,
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+# Page stamps such as "Page 3 of 12", "Pg. 3" or "3 / 12" once digits are masked
+_PAGE_STAMP = re.compile(r"\b(page|pg|p)\b\.?\s*#|#\s*(of|/)\s*#")
+# Lines that are only a number or a measured value ("12", "0.5 mm", "25 Nm") are table content
+_VALUE_LINE = re.compile(
+    r"^[\s\d.,:;+\-±/()%°x×]*(mm|cm|m|µm|um|in|nm|n·m|kg|g|lb|lbf|s|sec|min|h|°c|°f|c|f|psi|bar|kpa|mpa|v|kv|a|ma|w|kw|hz|rpm)?[\s.)]*$",
+    re.IGNORECASE,
+)
+
+def _line_key(line: str) -> str:
+    """Header/footer key. Digits are masked only for page stamps, so their varying
+    (and possibly offset) page numbers still match while other lines must repeat exactly."""
+    key = " ".join(line.split()).lower()
+    masked = re.sub(r"\d+", "#", key)
+    return masked if _PAGE_STAMP.search(masked) else key
+
+def _edge_lines(page: Document) -> List[str]:
+    """Header/footer candidates: the first and last few non-empty, non-value lines of a page."""
+    lines = [line for line in page.page_content.splitlines() if line.strip()]
+    n = settings.BOILERPLATE_EDGE_LINES
+    edges = lines if len(lines) <= 2 * n else lines[:n] + lines[-n:]
+    return [line for line in edges if not _VALUE_LINE.match(line)]
+
+def find_boilerplate(pages: List[Document]) -> Set[str]:
+    """Line keys (headers, footers, page stamps) repeated at the edges of most pages of one document."""
+    if len(pages) < settings.BOILERPLATE_MIN_PAGES:
+        return set()
+    counts = Counter()
+    for page in pages:
+        counts.update({_line_key(line) for line in _edge_lines(page)})
+    threshold = max(2, settings.BOILERPLATE_PAGE_RATIO * len(pages))
+    return {key for key, count in counts.items() if count >= threshold}
+
+def _is_boilerplate(line: str, boilerplate: Set[str]) -> bool:
+    return not _VALUE_LINE.match(line) and _line_key(line) in boilerplate
+
+def _strip_boilerplate(page: Document, boilerplate: Set[str]) -> str:
+    text = page.page_content
+    if not boilerplate:
+        return text.strip()
+    lines = text.splitlines()
+    body = [i for i, line in enumerate(lines) if line.strip()]
+    # Walk inward from each edge and stop at the first body line, so repeated table
+    # labels or values inside the page are never removed
+    n = settings.BOILERPLATE_EDGE_LINES
+    top = 0
+    while top < min(n, len(body)) and _is_boilerplate(lines[body[top]], boilerplate):
+        top += 1
+    bottom = len(body)
+    while bottom > max(top, len(body) - n) and _is_boilerplate(lines[body[bottom - 1]], boilerplate):
+        bottom -= 1
+    if top == bottom:
+        return ""
+    return "\n".join(lines[body[top]:body[bottom - 1] + 1]).strip()
+
+def _merged_chunk(pages: List[Document], texts: List[str]) -> Document:
+    metadata = dict(pages[0].metadata)
+    metadata["page_end"] = pages[-1].metadata.get("page")
+    metadata["start_index"] = 0
+    return Document(page_content="\n\n".join(texts), metadata=metadata)
+
+def _chunk_source(pages: List[Document], text_splitter: RecursiveCharacterTextSplitter) -> List[Document]:
+    """Chunks one document's pages: drop boilerplate, merge small pages, split large ones."""
+    boilerplate = find_boilerplate(pages)
+    chunks = []
+    buffer_pages, buffer_texts, buffer_len = [], [], 0
+
+    def flush():
+        nonlocal buffer_pages, buffer_texts, buffer_len
+        if buffer_pages:
+            chunks.append(_merged_chunk(buffer_pages, buffer_texts))
+        buffer_pages, buffer_texts, buffer_len = [], [], 0
+
+    for page in pages:
+        text = _strip_boilerplate(page, boilerplate)
+        if not text:
+            continue
+
+        if len(text) > settings.CHUNK_SIZE:
+            # Oversized pages are split on their own and keep single-page citations
+            flush()
+            page_doc = Document(page_content=text, metadata={**page.metadata, "page_end": page.metadata.get("page")})
+            chunks.extend(text_splitter.split_documents([page_doc]))
+            continue
+
+        # +2 for the blank line joining merged pages
+        if buffer_pages and buffer_len + 2 + len(text) > settings.CHUNK_SIZE:
+            flush()
+        buffer_pages.append(page)
+        buffer_texts.append(text)
+        buffer_len += len(text) + (2 if buffer_len else 0)
+
+    flush()
+    return chunks
+
 def chunk_documents(documents: List[Document]) -> List[Document]:
-    """Splits documents into semantic chunks while preserving source metadata."""
+    """Splits documents into chunks while preserving source metadata.
+
+    Works per source document in linear time: lines repeated across most pages
+    are removed, consecutive small pages are merged up to CHUNK_SIZE, and every
+    chunk records the page span it covers (`page` .. `page_end`) for citations.
+    """
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=settings.CHUNK_SIZE,
         chunk_overlap=settings.CHUNK_OVERLAP,
         add_start_index=True,
     )
-    # metadata is preserved by default in LangChain's RecursiveCharacterTextSplitter
-    chunks = text_splitter.split_documents(documents)
+    # Pages arrive grouped by file; dicts keep that order
+    by_source: Dict[str, List[Document]] = {}
+    for doc in documents:
+        by_source.setdefault(doc.metadata.get("source", ""), []).append(doc)
+
+    chunks = []
+    for pages in by_source.values():
+        chunks.extend(_chunk_source(pages, text_splitter))
+    for chunk in chunks:
+        chunk.metadata["chunk_id"] = make_chunk_id(chunk)
     logger.info(f"Split {len(documents)} documents into {len(chunks)} chunks")
     return chunks
 
-def index_chunks(chunks: List[Document], index_dir: str):
+def index_chunks(chunks: List[Document], index_dir: str, embedding_function=None):
     """Indexes chunks into ChromaDB."""
     if not chunks:
         logger.warning("No chunks to index.")
         return
 
-    embedding_function = SentenceTransformerEmbeddings(model_name=settings.EMBEDDING_MODEL)
+    embedding_function = embedding_function or SentenceTransformerEmbeddings(model_name=settings.EMBEDDING_MODEL)
     
-    # Ensure index_dir is completely clean before building
-    if os.path.exists(index_dir):
-        shutil.rmtree(index_dir)
-    os.makedirs(index_dir)
+    # Build into a staging directory so readers never see a half-written index
+    staging_dir = f"{index_dir}.building"
+    old_dir = f"{index_dir}.old"
+    if os.path.exists(old_dir):
+        if not os.path.exists(index_dir):
+            # A previous swap died between its two renames; put the last good index back
+            os.replace(old_dir, index_dir)
+        else:
+            shutil.rmtree(old_dir)
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
 
     # Initialize Chroma and persist
     Chroma.from_documents(
         documents=chunks,
         embedding=embedding_function,
-        persist_directory=index_dir
+        ids=[chunk.metadata["chunk_id"] for chunk in chunks],
+        persist_directory=staging_dir
     )
+    # Chroma caches a client per path; the staging client would keep pointing at the
+    # SQLite file we are about to move, making the next build fail as read-only
+    SharedSystemClient.clear_system_cache()
+
+    # Move the live index aside before swapping so INDEX_DIR is only missing between
+    # two renames, and a crash there still leaves a recoverable copy
+    if os.path.exists(index_dir):
+        os.replace(index_dir, old_dir)
+    os.replace(staging_dir, index_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
     logger.info(f"Successfully indexed {len(chunks)} chunks to {index_dir}")
 
+def _rebuild_index():
+    """Rebuilds INDEX_DIR from DOCS_DIR. Callers must hold `index_lock`."""
+    logger.info("Starting atomic ingestion...")
+    try:
+        docs = load_documents(settings.DOCS_DIR)
+        if not docs:
+            # If no docs, ensure index is cleared
+            if os.path.exists(settings.INDEX_DIR):
+                shutil.rmtree(settings.INDEX_DIR)
+            mark_index_updated()
+            logger.info("No documents found. Index cleared.")
+            return
+            
+        chunks = chunk_documents(docs)
+        index_chunks(chunks, settings.INDEX_DIR)
+        mark_index_updated()
+        logger.info("Atomic ingestion complete.")
+    except Exception as e:
+        logger.error(f"Ingestion critical failure: {e}")
+
 def ingest_docs():
-    """Main entry point for ingestion with active locking."""
-    if _ingestion_lock.locked():
-        logger.warning("Ingestion already in progress. Skipping concurrent task.")
-        return
+    """Main entry point for ingestion, safe across threads and worker processes.
 
-    with _ingestion_lock:
-        logger.info("Starting atomic ingestion...")
-        try:
-            docs = load_documents(settings.DOCS_DIR)
-            if not docs:
-                # If no docs, ensure index is cleared
-                if os.path.exists(settings.INDEX_DIR):
-                    shutil.rmtree(settings.INDEX_DIR)
-                logger.info("No documents found. Index cleared.")
+    Whichever worker takes the index lock becomes the ingestion leader and keeps
+    rebuilding until no requests are pending; other callers just leave a request
+    behind for the leader to pick up.
+    """
+    request_ingestion()
+    while True:
+        with index_lock(blocking=False) as acquired:
+            if not acquired:
+                logger.info("Ingestion already in progress in another worker. Request queued.")
                 return
-                
-            chunks = chunk_documents(docs)
-            index_chunks(chunks, settings.INDEX_DIR)
-            logger.info("Atomic ingestion complete.")
-        except Exception as e:
-            logger.error(f"Ingestion critical failure: {e}")
+            with ingestion_marker():
+                while take_ingestion_request():
+                    _rebuild_index()
+        # A request may have landed between the last check and releasing the lock
+        if not has_ingestion_request():
+            return
 
 if __name__ == "__main__":
     ingest_docs()
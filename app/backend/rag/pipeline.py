@@ -1,18 +1,35 @@
-from typing import List, Any
+import time
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Any, Tuple
 from app.backend.rag.retriever import Retriever
 from app.backend.rag.generator import get_llm_client, LLMClient
+from app.backend.rag.index_state import get_index_generation
 from langchain_core.documents import Document
 
+def normalize_question(query: str) -> str:
+    """Collapses case and whitespace so trivially different phrasings share a key."""
+    return " ".join(query.split()).lower()
+
 class RAGPipeline:
-    def __init__(self):
-        self.retriever = Retriever()
-        self.llm: LLMClient = get_llm_client()
+    def __init__(self, retriever: Retriever = None, llm: LLMClient = None):
+        self.retriever = retriever or Retriever()
+        self.llm: LLMClient = llm or get_llm_client()
+
+        # Single-flight state: identical concurrent questions against the same
+        # index generation wait on one computation instead of each running it
+        self._flights: Dict[Tuple[str, int], Future] = {}
+        self._flights_lock = threading.Lock()
+        self._stats = {"requests": 0, "computed": 0, "coalesced": 0}
 
     def build_prompt(self, query: str, context_chunks: List[Any]) -> str:
         context_text = ""
         for i, (doc, score) in enumerate(context_chunks):
             source = doc.metadata.get("source", "Unknown")
             page = doc.metadata.get("page", "Unknown")
+            page_end = doc.metadata.get("page_end", page)
+            if page_end != page:
+                page = f"{page}-{page_end}"
             content = doc.page_content.replace("\n", " ")
             context_text += f"[{i+1}] Source: {source}, Page: {page}\nContent: {content}\n\n"
 
@@ -34,17 +51,61 @@ Answer:"""
         return prompt
 
     def run(self, query: str):
+        """Answers a query, sharing the result with identical in-flight queries."""
+        key = (normalize_question(query), get_index_generation())
+
+        with self._flights_lock:
+            self._stats["requests"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = Future()
+                self._flights[key] = flight
+                self._stats["computed"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            # Followers only wait; abandoning the wait never affects the leader
+            return flight.result()
+
+        try:
+            result = self._run_uncoalesced(query)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns request coalescing counters."""
+        with self._flights_lock:
+            return {**self._stats, "in_flight": len(self._flights)}
+
+    def _run_uncoalesced(self, query: str):
         # 1. Retrieve
+        start = time.perf_counter()
         retrieved_docs = self.retriever.retrieve(query)
+        retrieved = time.perf_counter()
         
         # 2. Build Prompt
         prompt = self.build_prompt(query, retrieved_docs)
         
         # 3. Generate
+        generating = time.perf_counter()
         answer = self.llm.generate(prompt)
+        generated = time.perf_counter()
         
         return {
             "answer": answer,
             "citations": retrieved_docs, # List[Tuple[Document, float]]
-            "raw_prompt": prompt
+            "raw_prompt": prompt,
+            "timings": {
+                "retrieval_ms": round((retrieved - start) * 1000, 1),
+                "prompt_ms": round((generating - retrieved) * 1000, 1),
+                "generation_ms": round((generated - generating) * 1000, 1),
+            }
         }
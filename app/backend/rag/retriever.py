@@ -2,27 +2,52 @@ from typing import List, Tuple
 from langchain_chroma import Chroma
 from langchain_community.embeddings import SentenceTransformerEmbeddings
 from langchain_core.documents import Document
+from chromadb.api.shared_system_client import SharedSystemClient
 from app.backend.core.config import settings
+from app.backend.rag.index_state import get_index_generation
 
 import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Retriever:
     def __init__(self):
         self.embedding_function = SentenceTransformerEmbeddings(model_name=settings.EMBEDDING_MODEL)
+        self._db = None
+        self._db_generation = None
 
     def _get_db(self):
-        """Re-initializes Chroma connection to ensure it syncs with physical files."""
+        """Returns a Chroma handle, reopening it whenever any worker rebuilt the index."""
+        generation = get_index_generation()
+        if self._db is not None and generation == self._db_generation:
+            return self._db
+
         # Check if index directory exists and is not empty
         if not os.path.exists(settings.INDEX_DIR) or not os.listdir(settings.INDEX_DIR):
+            self._db = None
             return None
-            
-        return Chroma(
+
+        if self._db_generation is not None:
+            # Chroma caches clients per path; drop them so we don't read a swapped-out index
+            SharedSystemClient.clear_system_cache()
+            logger.info(f"Reloading index at generation {generation}")
+
+        self._db = Chroma(
             persist_directory=settings.INDEX_DIR,
             embedding_function=self.embedding_function
         )
+        self._db_generation = generation
+        return self._db
+
+    def warmup(self):
+        """Runs one embedding and opens the index so the first real query is not slow."""
+        self.embedding_function.embed_query("warmup")
+        self._get_db()
 
     def retrieve(self, query: str, k: int = settings.VECTOR_DB_K) -> List[Tuple[Document, float]]:
-        """Retrieves top-k documents with a fresh DB connection and retry logic."""
+        """Retrieves top-k documents from the current index generation with retry logic."""
         for attempt in range(3):
             db = self._get_db()
             if not db:
@@ -35,7 +60,15 @@ class Retriever:
             except Exception as e:
                 # Handle cases where DB is specifically locked or corrupted during re-indexing
                 logger.warning(f"Retrieval attempt {attempt+1} failed: {e}")
+                self._db = None  # Force a reopen on the next attempt
                 time.sleep(2)  # Wait for ingestion to finish
                 
         logger.error("All retrieval attempts failed.")
         return []
+
+    def get_chunks(self, chunk_ids: List[str]) -> List[Document]:
+        """Fetches indexed chunks by ID; unknown IDs are omitted."""
+        db = self._get_db()
+        if not db or not chunk_ids:
+            return []
+        return db.get_by_ids(chunk_ids)
@@ -2,7 +2,13 @@ import os
 import shutil
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
 from app.backend.core.config import settings
-from app.backend.rag.ingest import ingest_docs
+from app.backend.rag.index_state import (
+    index_lock,
+    mark_index_updated,
+    ingestion_status,
+    request_ingestion,
+    has_orphaned_ingestion_request,
+)
 import logging
 
 router = APIRouter()
@@ -12,10 +18,19 @@ def run_ingestion_task():
     """Background task to run ingestion."""
     logger.info("Triggering background ingestion...")
     try:
+        # Deferred: ingestion pulls in the PDF loader, splitter and embedding stack
+        from app.backend.rag.ingest import ingest_docs
         ingest_docs()
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
 
+def recover_orphaned_ingestion():
+    """Drains a rebuild request stranded by a worker that died while holding the lock."""
+    if not has_orphaned_ingestion_request():
+        return
+    logger.warning("Found a queued ingestion with no live leader. Resuming it.")
+    run_ingestion_task()
+
 @router.post("/upload")
 async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """Upload a document and trigger re-indexing."""
@@ -34,7 +49,8 @@ async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File
             
         logger.info(f"File {file.filename} saved to {settings.DOCS_DIR}")
         
-        # Trigger re-indexing in background
+        # Trigger re-indexing in background; queue it first so /status reports it immediately
+        request_ingestion()
         background_tasks.add_task(run_ingestion_task)
         
         return {"message": f"File {file.filename} uploaded successfully. Ingestion started."}
@@ -51,6 +67,11 @@ async def list_files():
     files = [f for f in os.listdir(settings.DOCS_DIR) if f.endswith('.pdf')]
     return {"files": sorted(files)}
 
+@router.get("/status")
+async def get_ingestion_status():
+    """Lightweight ingestion status for clients to poll after uploads and deletes."""
+    return ingestion_status()
+
 @router.delete("/files/{filename}")
 async def delete_file(filename: str, background_tasks: BackgroundTasks):
     """Delete a specific document and trigger re-indexing."""
@@ -62,6 +83,7 @@ async def delete_file(filename: str, background_tasks: BackgroundTasks):
         os.remove(file_path)
         logger.info(f"File {filename} deleted.")
         # Trigger re-indexing to purge from vector DB
+        request_ingestion()
         background_tasks.add_task(run_ingestion_task)
         return {"message": f"File {filename} deleted and re-indexing started."}
     except Exception as e:
@@ -69,16 +91,19 @@ async def delete_file(filename: str, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/files")
-async def clear_all_files(background_tasks: BackgroundTasks):
+def clear_all_files(background_tasks: BackgroundTasks):
     """Delete all documents and clear the index."""
     try:
-        if os.path.exists(settings.DOCS_DIR):
-            shutil.rmtree(settings.DOCS_DIR)
-            os.makedirs(settings.DOCS_DIR)
-        
-        # Also clear index immediately for better feedback
-        if os.path.exists(settings.INDEX_DIR):
-            shutil.rmtree(settings.INDEX_DIR)
+        # Wait for any worker's in-progress ingestion so we don't clear mid-build
+        with index_lock():
+            if os.path.exists(settings.DOCS_DIR):
+                shutil.rmtree(settings.DOCS_DIR)
+                os.makedirs(settings.DOCS_DIR)
+            
+            # Also clear index immediately for better feedback
+            if os.path.exists(settings.INDEX_DIR):
+                shutil.rmtree(settings.INDEX_DIR)
+            mark_index_updated()
             
         logger.info("All files and index cleared.")
         return {"message": "All files and index have been cleared."}
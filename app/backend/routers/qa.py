@@ -1,19 +1,48 @@
-from fastapi import APIRouter, HTTPException
-from app.backend.models.api import QueryRequest, QueryResponse, Citation, RawContext
-from app.backend.rag.pipeline import RAGPipeline
+import time
+import hashlib
+from typing import List
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from app.backend.core.config import settings
+from app.backend.models.api import QueryRequest, QueryResponse, Citation, RawContext, Chunk, ChunkBatchRequest
+from app.backend.rag.index_state import get_index_generation
+from app.backend.core.tracing import tracing_enabled, write_trace
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Initialize pipeline once (load model, etc.)
-# In a real heavy app, use lifecycle events or dependency injection to load lazily or on startup
-try:
-    rag_pipeline = RAGPipeline()
-except Exception as e:
-    logger.error(f"Failed to initialize RAG Pipeline: {e}")
-    # We don't raise here to allow app to start even if RAG fails (e.g. no index yet)
-    rag_pipeline = None
+# Built by the app lifespan warmup (see main.py) so importing the app stays cheap.
+# Queries return 503 until it is ready.
+rag_pipeline = None
+
+def init_pipeline(profile):
+    """Builds the RAG pipeline in stages, recording each stage in `profile`."""
+    global rag_pipeline
+    with profile.stage("pipeline_import"):
+        for module in ("langchain_core", "chromadb", "langchain_chroma", "sentence_transformers", "app.backend.rag.pipeline"):
+            profile.timed_import(module)
+    from app.backend.rag.pipeline import RAGPipeline
+    from app.backend.rag.retriever import Retriever
+    from app.backend.rag.generator import get_llm_client
+
+    with profile.stage("llm_client"):
+        llm = get_llm_client()
+    with profile.stage("embedding_model_load"):
+        retriever = Retriever()
+    with profile.stage("retriever_warmup"):
+        retriever.warmup()
+    rag_pipeline = RAGPipeline(retriever=retriever, llm=llm)
+
+def _chunk_id(doc) -> str:
+    # Older indexes have no chunk_id metadata; fall back to Chroma's own ID
+    return doc.metadata.get("chunk_id") or doc.id
+
+def _snippet(text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) <= settings.CONTEXT_SNIPPET_CHARS:
+        return text
+    return text[:settings.CONTEXT_SNIPPET_CHARS].rstrip() + "…"
 
 @router.post("/query", response_model=QueryResponse)
 async def query_rag(request: QueryRequest):
@@ -21,7 +50,24 @@ async def query_rag(request: QueryRequest):
         raise HTTPException(status_code=503, detail="RAG Pipeline not initialized (Index missing?)")
     
     try:
-        result = rag_pipeline.run(request.question)
+        started_at = time.time()
+        start = time.perf_counter()
+        # Run off the event loop so identical concurrent queries can coalesce
+        result = await run_in_threadpool(rag_pipeline.run, request.question)
+
+        if tracing_enabled():
+            # Trace capture is best-effort; it must never fail an answered query
+            try:
+                write_trace({
+                    "ts": round(started_at, 3),
+                    "question": request.question,
+                    # No retrieval filters exist yet; request options are recorded in their place
+                    "filters": {"include_context": request.include_context},
+                    "timings": {**result.get("timings", {}), "total_ms": round((time.perf_counter() - start) * 1000, 1)},
+                    "chunk_ids": [_chunk_id(doc) for doc, _ in result["citations"]],
+                })
+            except Exception as e:
+                logger.warning(f"Failed to write query trace: {e}")
         
         # Format citations
         citations = []
@@ -30,6 +76,7 @@ async def query_rag(request: QueryRequest):
         for doc, score in result["citations"]:
             source = doc.metadata.get("source", "Unknown")
             page = doc.metadata.get("page", None)
+            page_end = doc.metadata.get("page_end", page)
             
             # Note: Chroma score is distance (lower is better) or similarity?
             # Standard SentenceTransformer + Chroma usually defaults to L2 (distance).
@@ -41,14 +88,26 @@ async def query_rag(request: QueryRequest):
             citations.append(Citation(
                 doc_name=source,
                 page=page,
+                page_end=page_end,
                 score=score
             ))
             
-            raw_context.append(RawContext(
-                content=doc.page_content,
-                doc_name=source,
-                page=page
-            ))
+            if request.include_context:
+                raw_context.append(RawContext(
+                    chunk_id=_chunk_id(doc),
+                    content=doc.page_content,
+                    doc_name=source,
+                    page=page,
+                    page_end=page_end
+                ))
+            else:
+                raw_context.append(RawContext(
+                    chunk_id=_chunk_id(doc),
+                    snippet=_snippet(doc.page_content),
+                    doc_name=source,
+                    page=page,
+                    page_end=page_end
+                ))
             
         return QueryResponse(
             answer=result["answer"],
@@ -59,3 +118,71 @@ async def query_rag(request: QueryRequest):
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+def _to_chunk(doc) -> Chunk:
+    return Chunk(
+        chunk_id=_chunk_id(doc),
+        content=doc.page_content,
+        doc_name=doc.metadata.get("source", "Unknown"),
+        page=doc.metadata.get("page", None),
+        page_end=doc.metadata.get("page_end", doc.metadata.get("page", None))
+    )
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison: accepts `*`, comma-separated lists and W/ validators."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    if "*" in candidates:
+        return True
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+# Chunk IDs are content-addressed, so a given ID always maps to the same text
+_CHUNK_CACHE_CONTROL = "private, max-age=3600"
+
+@router.get("/chunks/{chunk_id}", response_model=Chunk)
+async def get_chunk(chunk_id: str, request: Request, response: Response):
+    """Full text of a single retrieved chunk, with ETag revalidation."""
+    if not rag_pipeline:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized (Index missing?)")
+
+    # Look up first so "If-None-Match: *" only matches a chunk that exists
+    docs = await run_in_threadpool(rag_pipeline.retriever.get_chunks, [chunk_id])
+    if not docs:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+
+    etag = f'"{chunk_id}"'
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _CHUNK_CACHE_CONTROL})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _CHUNK_CACHE_CONTROL
+    return _to_chunk(docs[0])
+
+@router.post("/chunks", response_model=List[Chunk])
+async def get_chunks(batch: ChunkBatchRequest, request: Request, response: Response):
+    """Full text of several chunks in one round trip. Unknown IDs are skipped."""
+    if not rag_pipeline:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized (Index missing?)")
+
+    ids = list(dict.fromkeys(batch.ids))
+    # Include the generation: IDs missing from an older index may exist in a newer one
+    key = f"{get_index_generation()}|" + "|".join(sorted(ids))
+    etag = '"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _CHUNK_CACHE_CONTROL})
+
+    docs = await run_in_threadpool(rag_pipeline.retriever.get_chunks, ids)
+    by_id = {_chunk_id(doc): doc for doc in docs}
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _CHUNK_CACHE_CONTROL
+    return [_to_chunk(by_id[i]) for i in ids if i in by_id]
+
+@router.get("/metrics")
+async def query_metrics():
+    """Query path counters, including how many requests were coalesced."""
+    if not rag_pipeline:
+        raise HTTPException(status_code=503, detail="RAG Pipeline not initialized (Index missing?)")
+    return {"coalescing": rag_pipeline.stats()}
@@ -0,0 +1,139 @@
+"""Replays a captured query trace against the backend and reports load metrics.
+
+Usage:
+    python -m app.backend.tools.replay data/query_trace.jsonl --speed 4
+
+By default the backend runs in-process with the real retriever and a mock LLM
+that sleeps for each question's recorded generation latency, so runs are
+repeatable and free. Pass --url to target an already running backend instead
+(it will use whatever LLM that server is configured with).
+"""
+import math
+import time
+import json
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List, Optional
+import httpx
+from app.backend.core.tracing import read_trace
+from app.backend.rag.generator import MockLLMClient
+from app.backend.rag.pipeline import normalize_question
+
+class ReplayLLMClient(MockLLMClient):
+    """Mock LLM that reproduces the generation latency recorded for each question."""
+    def __init__(self, latencies: Dict[str, float], default_latency: float = 0.0):
+        self.latencies = latencies
+        self.default_latency = default_latency
+
+    def generate(self, prompt: str) -> str:
+        # build_prompt ends with "Question: {query}\n\nAnswer:"
+        question = prompt.rsplit("Question:", 1)[-1].rsplit("Answer:", 1)[0]
+        time.sleep(self.latencies.get(normalize_question(question), self.default_latency))
+        return super().generate(prompt)
+
+def build_latency_table(records: List[dict]) -> Dict[str, float]:
+    """Mean recorded generation latency (seconds) per normalized question."""
+    samples: Dict[str, List[float]] = {}
+    for record in records:
+        ms = record.get("timings", {}).get("generation_ms")
+        if ms is not None:
+            samples.setdefault(normalize_question(record["question"]), []).append(ms / 1000)
+    return {q: statistics.mean(v) for q, v in samples.items()}
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def chunk_drift(recorded: List[str], replayed: List[str]) -> float:
+    """0.0 when the same chunks were retrieved, 1.0 when none overlap (Jaccard distance)."""
+    a, b = set(recorded), set(replayed)
+    if not a and not b:
+        return 0.0
+    return 1 - len(a & b) / len(a | b)
+
+async def _send(client: httpx.AsyncClient, record: dict, delay: float) -> dict:
+    await asyncio.sleep(delay)
+    # Replay the recorded request options so payload sizes match production traffic
+    body = {"question": record["question"], **record.get("filters", {})}
+    start = time.perf_counter()
+    try:
+        resp = await client.post("/api/query", json=body)
+        latency = time.perf_counter() - start
+        if resp.status_code != 200:
+            return {"ok": False, "latency": latency, "status": resp.status_code}
+        chunk_ids = [ctx.get("chunk_id") for ctx in resp.json().get("raw_context", [])]
+        return {"ok": True, "latency": latency, "chunk_ids": chunk_ids}
+    except httpx.HTTPError as e:
+        return {"ok": False, "latency": time.perf_counter() - start, "status": str(e)}
+
+async def replay(records: List[dict], client: httpx.AsyncClient, speed: float = 1.0) -> dict:
+    """Sends every record at its original offset divided by `speed` (0 = all at once)."""
+    if not records:
+        return summarize([], [], 0.0)
+    t0 = records[0].get("ts", 0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        _send(client, r, (r.get("ts", t0) - t0) / speed if speed > 0 else 0.0)
+        for r in records
+    ])
+    return summarize(records, results, time.perf_counter() - start)
+
+def summarize(records: List[dict], results: List[dict], wall_seconds: float) -> dict:
+    latencies = [r["latency"] for r in results if r["ok"]]
+    drifts = [
+        chunk_drift(record.get("chunk_ids", []), result["chunk_ids"])
+        for record, result in zip(records, results) if result["ok"]
+    ]
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for r in results if not r["ok"]),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(max(latencies) if latencies else None),
+        },
+        "retrieval_drift": {
+            "mean": round(statistics.mean(drifts), 3) if drifts else None,
+            "changed": sum(1 for d in drifts if d > 0),
+        },
+    }
+
+def _local_client(records: List[dict]) -> httpx.AsyncClient:
+    """In-process backend with the real retriever and a latency-replaying mock LLM."""
+    from app.backend.main import app
+    from app.backend.routers import qa
+    from app.backend.rag.pipeline import RAGPipeline
+    from app.backend.rag.retriever import Retriever
+
+    qa.rag_pipeline = RAGPipeline(retriever=Retriever(), llm=ReplayLLMClient(build_latency_table(records)))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay", timeout=None)
+
+async def _main(args):
+    records = read_trace(args.trace)[:args.limit or None]
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url.rstrip("/"), timeout=None)
+    else:
+        client = _local_client(records)
+    async with client:
+        report = await replay(records, client, speed=args.speed)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a query trace against the backend.")
+    parser.add_argument("trace", help="Path to a QUERY_TRACE_PATH JSONL file")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing multiplier (1 = original, 0 = all at once)")
+    parser.add_argument("--url", default=None, help="Running backend root, e.g. http://localhost:8000")
+    parser.add_argument("--limit", type=int, default=0, help="Only replay the first N records")
+    asyncio.run(_main(parser.parse_args()))
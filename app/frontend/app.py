@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import os
 import re
@@ -8,6 +9,18 @@ from datetime import datetime
 # --- Configuration ---
 DEFAULT_API_URL = os.getenv("DEFAULT_API_URL", "http://localhost:8000/api")
 
+# Every widget interaction reruns the script, so backend reads are TTL-cached
+HEALTH_TTL = 15
+FILES_TTL = 30
+STATUS_POLL_SECONDS = 2
+STATUS_POLL_LIMIT = 600  # Stop polling after this many seconds even if ingestion never reports done
+
+# Request timeouts in seconds
+READ_TIMEOUT = 3
+UPLOAD_TIMEOUT = 60
+DELETE_TIMEOUT = 10
+QUERY_TIMEOUT = 120
+
 st.set_page_config(
     page_title="Industrial IQ | Autonomous Intelligence",
     page_icon="🦾",
@@ -163,37 +176,116 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "api_url" not in st.session_state:
     st.session_state.api_url = DEFAULT_API_URL
+if "chunk_cache" not in st.session_state:
+    st.session_state.chunk_cache = {}
+
+if "ingesting" not in st.session_state:
+    st.session_state.ingesting = False
+    st.session_state.ingesting_since = 0.0
+
+# --- Backend Access ---
+def http():
+    """Keep-alive session reused across reruns instead of a new connection per call."""
+    if "http" not in st.session_state:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        st.session_state.http = session
+    return st.session_state.http
+
+def cached(key, ttl, fetch):
+    """Returns the session-cached value for `key`, refetching once it is older than `ttl`."""
+    entry = st.session_state.get(f"_cache_{key}")
+    now = time.monotonic()
+    if entry and now - entry[0] < ttl:
+        return entry[1]
+    value = fetch()
+    st.session_state[f"_cache_{key}"] = (now, value)
+    return value
 
-# Sync indexed_files with backend on startup
-if "synced" not in st.session_state:
+def invalidate(*keys):
+    for key in keys:
+        st.session_state.pop(f"_cache_{key}", None)
+
+def fetch_files():
     try:
-        resp = requests.get(f"{st.session_state.api_url}/admin/files", timeout=2)
+        resp = http().get(f"{st.session_state.api_url}/admin/files", timeout=READ_TIMEOUT)
         if resp.status_code == 200:
-            st.session_state.indexed_files = resp.json().get("files", [])
-            st.session_state.synced = True
-    except:
-        st.session_state.indexed_files = []
+            return resp.json().get("files", [])
+    except requests.RequestException:
+        pass
+    return []
 
 # --- Actions ---
 def check_connection():
     try:
-        resp = requests.get(f"{st.session_state.api_url}/health", timeout=3)
+        resp = http().get(f"{st.session_state.api_url}/health", timeout=READ_TIMEOUT)
         return "LINKED" if resp.status_code == 200 else "OFFLINE"
-    except:
+    except requests.RequestException:
         return "DISCONNECTED"
+
+def fetch_ingestion_status():
+    resp = http().get(f"{st.session_state.api_url}/admin/status", timeout=READ_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+def load_chunks(chunk_ids):
+    """Fetch full chunk text for IDs not already cached in this session."""
+    missing = [cid for cid in chunk_ids if cid and cid not in st.session_state.chunk_cache]
+    if not missing:
+        return
+    resp = http().post(f"{st.session_state.api_url}/chunks", json={"ids": missing}, timeout=READ_TIMEOUT * 3)
+    if resp.status_code == 200:
+        for chunk in resp.json():
+            st.session_state.chunk_cache[chunk["chunk_id"]] = chunk["content"]
+
+def page_label(item):
+    """Page citation, shown as a span when a chunk covers several merged pages."""
+    page, page_end = item.get("page"), item.get("page_end")
+    return f"{page}-{page_end}" if page_end and page_end != page else f"{page}"
+
 def clean_answer(text):
     text = re.sub(r'\[[^\]]*\]', '', text)
     text = re.sub(r'\(Source:[^)]*\)', '', text)
     text = re.sub(r'\*\s+', '', text)
     return text.strip()
 
+def start_ingestion_polling():
+    st.session_state.ingesting = True
+    st.session_state.ingesting_since = time.monotonic()
+
+def stop_ingestion_polling():
+    st.session_state.ingesting = False
+    invalidate("files")
+    st.rerun()
+
+@st.fragment(run_every=STATUS_POLL_SECONDS if st.session_state.ingesting else None)
+def ingestion_status_panel():
+    """Polls ingestion status on its own timer while a rebuild is running, without full reruns."""
+    if not st.session_state.ingesting:
+        return
+    if time.monotonic() - st.session_state.ingesting_since > STATUS_POLL_LIMIT:
+        # Bounded so a stuck backend can't keep every open tab polling forever
+        stop_ingestion_polling()
+    try:
+        status = fetch_ingestion_status()
+    except requests.RequestException:
+        st.caption("INGESTION STATUS UNAVAILABLE")
+        return
+    if status.get("ingesting") or status.get("pending"):
+        st.caption("INDEXING DOCUMENTS...")
+    else:
+        stop_ingestion_polling()
+
 # --- Sidebar ---
-# --- Sidebar ---
+st.session_state.indexed_files = cached("files", FILES_TTL, fetch_files)
+
 with st.sidebar:
     st.markdown('<div style="font-size: 1.4rem; font-weight:700; color:#000000; margin-bottom:1.5rem; letter-spacing:-1px;">ARCHIVES</div>', unsafe_allow_html=True)
     
     # Industrial Status Panel
-    conn_status = check_connection()
+    conn_status = cached("health", HEALTH_TTL, check_connection)
     st.markdown(f'''
     <div class="status-panel">
         <div class="status-item"><span>CORE STATUS</span> <span style="font-weight:700;">ACTIVE</span></div>
@@ -203,6 +295,7 @@ with st.sidebar:
         <div style="display:flex; justify-content:center; color:#ccc;">{ICON_WAV}</div>
     </div>
     ''', unsafe_allow_html=True)
+    ingestion_status_panel()
     
     # Persistent Uploader Section
     st.markdown('<div style="font-size:0.75rem; font-weight:700; color:#888; margin-bottom:8px;">INGEST NEW DATA</div>', unsafe_allow_html=True)
@@ -212,14 +305,14 @@ with st.sidebar:
             with st.spinner("Processing..."):
                 for f in files:
                     try:
-                        resp = requests.post(f"{st.session_state.api_url}/admin/upload", files={"file": (f.name, f)})
+                        resp = http().post(f"{st.session_state.api_url}/admin/upload", files={"file": (f.name, f)}, timeout=UPLOAD_TIMEOUT)
                         if resp.status_code == 200:
-                            if f.name not in st.session_state.indexed_files:
-                                st.session_state.indexed_files.append(f.name)
+                            start_ingestion_polling()
                         else:
                             st.error(f"Failed to upload {f.name}")
                     except Exception as e:
                         st.error(f"Error connecting to backend: {str(e)}")
+                invalidate("files")
                 st.rerun()
 
     st.markdown('<div style="height:1.5rem; border-bottom:1px solid #eee; margin-bottom:1.5rem;"></div>', unsafe_allow_html=True)
@@ -234,9 +327,10 @@ with st.sidebar:
             with col2:
                 if st.button("×", key=f"del_{fname}_{i}"): # More unique key
                     try:
-                        resp = requests.delete(f"{st.session_state.api_url}/admin/files/{fname}")
+                        resp = http().delete(f"{st.session_state.api_url}/admin/files/{fname}", timeout=DELETE_TIMEOUT)
                         if resp.status_code == 200:
-                            st.session_state.indexed_files.pop(i)
+                            start_ingestion_polling()
+                            invalidate("files")
                             st.rerun()
                         else:
                             st.error(f"Failed to delete {fname}")
@@ -246,9 +340,9 @@ with st.sidebar:
         st.markdown('<div style="height:1.5rem;"></div>', unsafe_allow_html=True)
         if st.button("CLEAR ALL", use_container_width=True):
             try:
-                resp = requests.delete(f"{st.session_state.api_url}/admin/files")
+                resp = http().delete(f"{st.session_state.api_url}/admin/files", timeout=DELETE_TIMEOUT)
                 if resp.status_code == 200:
-                    st.session_state.indexed_files = []
+                    invalidate("files")
                     st.rerun()
                 else:
                     st.error("Failed to clear archives")
@@ -271,11 +365,26 @@ for idx, msg in enumerate(st.session_state.messages):
         
         if msg["role"] == "assistant":
             if "citations" in msg and msg["citations"]:
-                unique = {(c['doc_name'], c['page']) for c in msg["citations"]}
+                unique = {(c['doc_name'], page_label(c)) for c in msg["citations"]}
                 pills = ""
                 for doc, pg in unique:
                     pills += f'<div class="source-long">{doc} // PG.{pg}</div>'
                 st.markdown(f'<div style="margin-top:20px; display:flex; flex-wrap:wrap; gap:10px;">{pills}</div>', unsafe_allow_html=True)
+
+            if msg.get("raw_context"):
+                with st.expander("SOURCE EXCERPTS"):
+                    cache = st.session_state.chunk_cache
+                    for ctx in msg["raw_context"]:
+                        text = ctx.get("content") or cache.get(ctx.get("chunk_id")) or ctx.get("snippet", "")
+                        st.markdown(f"**{ctx['doc_name']} // PG.{page_label(ctx)}**")
+                        st.caption(text)
+                    if any(not ctx.get("content") and ctx.get("chunk_id") not in cache for ctx in msg["raw_context"]):
+                        if st.button("LOAD FULL TEXT", key=f"ctx_{idx}"):
+                            try:
+                                load_chunks([ctx.get("chunk_id") for ctx in msg["raw_context"]])
+                                st.rerun()
+                            except requests.RequestException as e:
+                                st.error(f"Error: {e}")
             
             ts = msg.get("timestamp", "")
             st.markdown(f'<div style="text-align:right; color:#adb5bd; font-family:JetBrains Mono; font-size:0.75rem; margin-top:8px;">{ts}</div>', unsafe_allow_html=True)
@@ -292,11 +401,12 @@ if prompt := st.chat_input("Input technical query..."):
         
         with st.spinner("PROBING ARCHIVES..."):
             try:
-                resp = requests.post(f"{st.session_state.api_url}/query", json={"question": prompt})
+                resp = http().post(f"{st.session_state.api_url}/query", json={"question": prompt, "include_context": False}, timeout=QUERY_TIMEOUT)
                 if resp.status_code == 200:
                     data = resp.json()
                     answer = clean_answer(data.get("answer", ""))
                     citations = data.get("citations", [])
+                    raw_context = data.get("raw_context", [])
                     
                     for word in answer.split():
                         response_text += word + " "
@@ -305,7 +415,7 @@ if prompt := st.chat_input("Input technical query..."):
                     placeholder.markdown(response_text.strip())
                     
                     if citations:
-                        unique = {(c['doc_name'], c['page']) for c in citations}
+                        unique = {(c['doc_name'], page_label(c)) for c in citations}
                         pills = ""
                         for doc, pg in unique:
                             pills += f'<div class="source-long">{doc} // PG.{pg}</div>'
@@ -316,6 +426,7 @@ if prompt := st.chat_input("Input technical query..."):
                         "role": "assistant",
                         "content": response_text,
                         "citations": citations,
+                        "raw_context": raw_context,
                         "timestamp": ts
                     })
                     # st.rerun() removed to avoid RerunException inside try block
@@ -10,3 +10,88 @@ def test_health_check():
 
 # We can add more tests here, but without a running DB/LLM they might require extensive mocking.
 # For now, health check confirms app structure is valid.
+
+from langchain_core.documents import Document
+from app.backend.routers import qa
+
+class FakeRetriever:
+    def __init__(self, docs):
+        self.docs = {d.metadata["chunk_id"]: d for d in docs}
+
+    def get_chunks(self, chunk_ids):
+        return [self.docs[i] for i in chunk_ids if i in self.docs]
+
+class FakePipeline:
+    def __init__(self, docs):
+        self.retriever = FakeRetriever(docs)
+        self.docs = docs
+
+    def run(self, query):
+        return {"answer": "Torque to 12 Nm.", "citations": [(d, 0.1) for d in self.docs], "raw_prompt": ""}
+
+def _fake_docs():
+    return [Document(page_content="Torque " * 100, metadata={"source": "sop.pdf", "page": 3, "chunk_id": "abc123"})]
+
+def test_query_can_return_lazy_context(monkeypatch):
+    monkeypatch.setattr(qa, "rag_pipeline", FakePipeline(_fake_docs()))
+    response = client.post("/api/query", json={"question": "Torque?", "include_context": False})
+    assert response.status_code == 200
+    ctx = response.json()["raw_context"][0]
+    assert ctx["chunk_id"] == "abc123"
+    assert ctx["content"] is None
+    assert ctx["snippet"].endswith("…")
+
+def test_chunk_fetch_supports_etag(monkeypatch):
+    monkeypatch.setattr(qa, "rag_pipeline", FakePipeline(_fake_docs()))
+    response = client.get("/api/chunks/abc123")
+    assert response.status_code == 200
+    assert response.json()["content"].startswith("Torque")
+    etag = response.headers["etag"]
+
+    assert client.get("/api/chunks/abc123", headers={"If-None-Match": etag}).status_code == 304
+    for header in [f'"other", {etag}', f"W/{etag}", "*"]:
+        assert client.get("/api/chunks/abc123", headers={"If-None-Match": header}).status_code == 304
+    assert client.get("/api/chunks/abc123", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert client.get("/api/chunks/missing", headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get("/api/chunks/missing").status_code == 404
+
+    batch = client.post("/api/chunks", json={"ids": ["abc123", "missing"]})
+    assert [c["chunk_id"] for c in batch.json()] == ["abc123"]
+
+def test_readiness_reports_startup_profile():
+    # Without the lifespan running, warmup has not happened yet
+    response = client.get("/api/ready")
+    assert response.status_code == 503
+    assert "app_import" in response.json()["stages"]
+
+def test_init_pipeline_builds_in_stages(monkeypatch):
+    from app.backend.core.profiling import StartupProfile
+    from app.backend.rag import retriever, generator
+
+    class StubRetriever:
+        def warmup(self):
+            pass
+
+    monkeypatch.setattr(retriever, "Retriever", StubRetriever)
+    monkeypatch.setattr(generator, "get_llm_client", generator.MockLLMClient)
+    monkeypatch.setattr(qa, "rag_pipeline", None)
+    profile = StartupProfile()
+
+    qa.init_pipeline(profile)
+
+    assert isinstance(qa.rag_pipeline.retriever, StubRetriever)
+    assert {"pipeline_import", "llm_client", "embedding_model_load", "retriever_warmup"} <= set(profile.stages)
+
+def test_ingestion_status_reports_queued_rebuild(tmp_path, monkeypatch):
+    from app.backend.core.config import settings
+    from app.backend.rag import index_state
+
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+    assert client.get("/api/admin/status").json()["pending"] is False
+
+    index_state.request_ingestion()
+    with index_state.ingestion_marker():
+        status = client.get("/api/admin/status").json()
+    assert status["pending"] is True
+    assert status["ingesting"] is True
+    assert client.get("/api/admin/status").json()["ingesting"] is False
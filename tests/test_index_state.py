@@ -0,0 +1,125 @@
+import os
+from app.backend.core.config import settings
+from app.backend.rag import index_state, ingest
+
+def test_generation_advances_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+
+    assert index_state.get_index_generation() == 0
+    with index_state.index_lock():
+        index_state.mark_index_updated()
+        index_state.mark_index_updated()
+    assert index_state.get_index_generation() == 2
+
+def test_ingestion_is_queued_while_another_worker_holds_the_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "DOCS_DIR", str(tmp_path / "docs"))
+
+    with index_state.index_lock() as held:
+        assert held
+        with index_state.index_lock(blocking=False) as acquired:
+            assert not acquired
+        ingest.ingest_docs()
+        assert index_state.has_ingestion_request()
+        assert index_state.get_index_generation() == 0
+
+    # The next leader drains the queued request
+    ingest.ingest_docs()
+    assert not index_state.has_ingestion_request()
+    assert index_state.get_index_generation() == 1
+    assert not os.path.exists(settings.INDEX_DIR)
+
+def test_index_can_be_rebuilt_repeatedly_in_one_process(tmp_path):
+    from langchain_chroma import Chroma
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import FakeEmbeddings
+
+    index_dir = str(tmp_path / "index")
+    embeddings = FakeEmbeddings(size=8)
+    for build in range(3):
+        chunk = Document(page_content=f"Build {build} torque spec.", metadata={"source": "sop.pdf", "page": 1})
+        chunk.metadata["chunk_id"] = ingest.make_chunk_id(chunk)
+        ingest.index_chunks([chunk], index_dir, embedding_function=embeddings)
+
+        db = Chroma(persist_directory=index_dir, embedding_function=embeddings)
+        assert db.get()["documents"] == [f"Build {build} torque spec."]
+
+def test_stale_ingestion_markers_are_ignored(tmp_path, monkeypatch):
+    import json
+    import socket
+    import subprocess
+    import time
+
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+    marker = f"{settings.INDEX_DIR}.ingesting"
+
+    with index_state.ingestion_marker():
+        assert index_state.ingestion_status()["ingesting"]
+
+    # Worker on this host died mid-rebuild
+    dead = subprocess.Popen(["true"])
+    dead.wait()
+    with open(marker, "w") as f:
+        json.dump({"pid": dead.pid, "host": socket.gethostname(), "started_at": time.time()}, f)
+    assert not index_state.ingestion_status()["ingesting"]
+
+    # Worker on another host whose marker outlived the age limit
+    with open(marker, "w") as f:
+        json.dump({"pid": 1, "host": "other-replica", "started_at": time.time() - settings.INGESTION_MARKER_MAX_AGE - 1}, f)
+    assert not index_state.ingestion_status()["ingesting"]
+
+def test_orphaned_ingestion_request_is_resumed(tmp_path, monkeypatch):
+    from app.backend.routers import admin
+
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "DOCS_DIR", str(tmp_path / "docs"))
+
+    # A live leader is still working on it: leave the request alone
+    index_state.request_ingestion()
+    with index_state.ingestion_marker():
+        admin.recover_orphaned_ingestion()
+        assert index_state.has_ingestion_request()
+
+    # The leader died (lock released, no live marker): the request is drained
+    admin.recover_orphaned_ingestion()
+    assert not index_state.has_ingestion_request()
+    assert index_state.get_index_generation() == 1
+
+def test_stale_pending_request_is_not_reported(tmp_path, monkeypatch):
+    import time
+
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+    index_state.request_ingestion()
+    assert index_state.ingestion_status()["pending"]
+
+    old = time.time() - settings.INGESTION_MARKER_MAX_AGE - 1
+    os.utime(f"{settings.INDEX_DIR}.pending", (old, old))
+    assert not index_state.ingestion_status()["pending"]
+
+    # Re-queuing refreshes the request
+    index_state.request_ingestion()
+    assert index_state.ingestion_status()["pending"]
+
+def test_interrupted_swap_restores_previous_index(tmp_path):
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import FakeEmbeddings
+
+    index_dir = str(tmp_path / "index")
+    embeddings = FakeEmbeddings(size=8)
+    chunk = Document(page_content="Torque spec.", metadata={"source": "sop.pdf", "page": 1, "chunk_id": "c1"})
+    ingest.index_chunks([chunk], index_dir, embedding_function=embeddings)
+    assert not os.path.exists(f"{index_dir}.old")
+
+    # Simulate a crash after the live index was moved aside but before the swap
+    os.replace(index_dir, f"{index_dir}.old")
+    class FailingEmbeddings(FakeEmbeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("OOM")
+
+    try:
+        ingest.index_chunks([chunk], index_dir, embedding_function=FailingEmbeddings(size=8))
+    except RuntimeError:
+        pass
+
+    assert os.path.exists(index_dir)
+    assert not os.path.exists(f"{index_dir}.old")
@@ -0,0 +1,69 @@
+from langchain_core.documents import Document
+from app.backend.core.config import settings
+from app.backend.rag.ingest import chunk_documents
+
+def _page(source, page, body):
+    text = f"ACME Corp SOP-12 Rev B\n{body}\nPage {page} of 6"
+    return Document(page_content=text, metadata={"source": source, "page": page})
+
+def test_small_pages_merge_with_page_span_and_boilerplate_removed():
+    steps = ["clean", "clamp", "preheat", "weld", "cool", "inspect"]
+    pages = [_page("sop.pdf", i, f"Next, {step} the seam.") for i, step in enumerate(steps, start=1)]
+    chunks = chunk_documents(pages)
+
+    assert len(chunks) == 1
+    chunk = chunks[0]
+    assert (chunk.metadata["page"], chunk.metadata["page_end"]) == (1, 6)
+    assert "ACME Corp" not in chunk.page_content
+    assert "Page 1 of 6" not in chunk.page_content
+    assert "Next, inspect the seam." in chunk.page_content
+    assert chunk.metadata["chunk_id"]
+
+def test_chunks_respect_size_and_do_not_cross_documents(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 120)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 10)
+    pages = [_page("a.pdf", i, letter * 50) for i, letter in enumerate("xyz", start=1)]
+    pages += [_page("b.pdf", 1, "long paragraph " * 30)]
+    chunks = chunk_documents(pages)
+
+    assert all(len(c.page_content) <= 120 for c in chunks)
+    a_spans = [(c.metadata["page"], c.metadata["page_end"]) for c in chunks if c.metadata["source"] == "a.pdf"]
+    assert a_spans == [(1, 2), (3, 3)]
+    b_chunks = [c for c in chunks if c.metadata["source"] == "b.pdf"]
+    assert len(b_chunks) > 1
+    assert all(c.metadata["page_end"] == 1 for c in b_chunks)
+    assert len({c.metadata["chunk_id"] for c in chunks}) == len(chunks)
+
+def test_footers_detected_when_printed_numbers_are_offset_from_pdf_index():
+    cover = Document(page_content="ACME Corp\nWelding SOP", metadata={"source": "sop.pdf", "page": 1})
+    steps = ["clean", "clamp", "preheat", "weld", "cool", "inspect"]
+    # Printed "Page i of 6" sits on PDF page i + 1 because the cover is unnumbered
+    pages = [cover] + [
+        Document(page_content=f"Next, {step} the seam.\nPage {i} of 6", metadata={"source": "sop.pdf", "page": i + 1})
+        for i, step in enumerate(steps, start=1)
+    ]
+    chunks = chunk_documents(pages)
+
+    text = "\n".join(c.page_content for c in chunks)
+    assert "of 6" not in text
+    assert "Welding SOP" in text
+    assert all(f"Next, {step} the seam." in text for step in steps)
+
+def test_varying_table_values_survive_boilerplate_removal():
+    specs = [("M6", "12", "0.5"), ("M8", "25", "0.8"), ("M10", "40", "1.0"), ("M12", "70", "1.2")]
+    pages = [
+        Document(
+            page_content=f"Step {i}: tighten bolt {bolt}\nTorque (Nm)\n{torque}\nGap\n{gap} mm",
+            metadata={"source": "spec.pdf", "page": i},
+        )
+        for i, (bolt, torque, gap) in enumerate(specs, start=1)
+    ]
+    chunks = chunk_documents(pages)
+
+    text = "\n".join(c.page_content for c in chunks)
+    for i, (bolt, torque, gap) in enumerate(specs, start=1):
+        assert f"Step {i}: tighten bolt {bolt}" in text
+        assert f"\n{torque}\n" in text
+        assert f"{gap} mm" in text
+    assert text.count("Torque (Nm)") == 4
+    assert text.count("Gap") == 4
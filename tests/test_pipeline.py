@@ -0,0 +1,65 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from app.backend.core.config import settings
+from app.backend.rag import index_state
+from app.backend.rag.pipeline import RAGPipeline
+
+class SlowRetriever:
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def retrieve(self, query):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        return [(Document(page_content="Torque to 12 Nm.", metadata={"source": "sop.pdf", "page": 1}), 0.1)]
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        return "Torque to 12 Nm."
+
+def wait_for_requests(pipeline, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while pipeline.stats()["requests"] < count:
+        assert time.monotonic() < deadline, f"timed out waiting for {count} requests"
+        time.sleep(0.001)
+
+def test_identical_concurrent_queries_are_coalesced():
+    retriever, llm = SlowRetriever(), CountingLLM()
+    pipeline = RAGPipeline(retriever=retriever, llm=llm)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(pipeline.run, q) for q in ["Torque spec?", "torque  SPEC?", "Torque spec?", "TORQUE spec?"]]
+        wait_for_requests(pipeline, 4)
+        retriever.release.set()
+        results = [f.result() for f in futures]
+
+    assert retriever.calls == 1
+    assert llm.calls == 1
+    assert all(r is results[0] for r in results)
+    stats = pipeline.stats()
+    assert stats["coalesced"] == 3
+    assert stats["in_flight"] == 0
+
+def test_new_index_generation_is_not_coalesced(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INDEX_DIR", str(tmp_path / "index"))
+    retriever, llm = SlowRetriever(), CountingLLM()
+    pipeline = RAGPipeline(retriever=retriever, llm=llm)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(pipeline.run, "Torque spec?")
+        wait_for_requests(pipeline, 1)
+        index_state.mark_index_updated()
+        second = pool.submit(pipeline.run, "Torque spec?")
+        wait_for_requests(pipeline, 2)
+        retriever.release.set()
+        first.result(), second.result()
+
+    assert retriever.calls == 2
+    assert pipeline.stats()["coalesced"] == 0
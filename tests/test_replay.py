@@ -0,0 +1,89 @@
+import asyncio
+import json
+import httpx
+from langchain_core.documents import Document
+from app.backend.core.config import settings
+from app.backend.core.tracing import read_trace
+from app.backend.main import app
+from app.backend.rag.pipeline import RAGPipeline
+from app.backend.routers import qa
+from app.backend.tools import replay
+
+class FixedRetriever:
+    def __init__(self, chunk_id):
+        self.chunk_id = chunk_id
+
+    def retrieve(self, query):
+        return [(Document(page_content="Torque to 12 Nm.", metadata={"source": "sop.pdf", "page": 1, "chunk_id": self.chunk_id}), 0.1)]
+
+def test_trace_capture_and_replay(tmp_path, monkeypatch):
+    trace_path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(settings, "QUERY_TRACE_PATH", str(trace_path))
+    llm = replay.ReplayLLMClient({"torque spec?": 0.01})
+    monkeypatch.setattr(qa, "rag_pipeline", RAGPipeline(retriever=FixedRetriever("abc"), llm=llm))
+
+    async def capture():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for question in ["Torque spec?", "Cure time?"]:
+                assert (await client.post("/api/query", json={"question": question})).status_code == 200
+
+    asyncio.run(capture())
+    records = read_trace(str(trace_path))
+    assert [r["question"] for r in records] == ["Torque spec?", "Cure time?"]
+    assert records[0]["chunk_ids"] == ["abc"]
+    assert records[0]["timings"]["generation_ms"] >= 10
+    assert replay.build_latency_table(records)["torque spec?"] >= 0.01
+
+    # Replaying against a changed index reports drift for every query
+    monkeypatch.setattr(settings, "QUERY_TRACE_PATH", "")
+    monkeypatch.setattr(qa, "rag_pipeline", RAGPipeline(retriever=FixedRetriever("xyz"), llm=llm))
+
+    async def run_replay():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await replay.replay(records, client, speed=0)
+
+    report = asyncio.run(run_replay())
+    assert report["requests"] == 2 and report["errors"] == 0
+    assert report["retrieval_drift"] == {"mean": 1.0, "changed": 2}
+    assert report["latency_ms"]["p50"] is not None
+    json.dumps(report)
+
+def test_chunk_drift_and_percentile():
+    assert replay.chunk_drift(["a", "b"], ["a", "b"]) == 0.0
+    assert replay.chunk_drift(["a", "b"], ["b", "c"]) == 1 - 1 / 3
+    assert replay.percentile([5, 1, 3, 2, 4], 50) == 3
+    assert replay.percentile([], 99) is None
+
+def test_trace_write_failure_does_not_fail_query(tmp_path, monkeypatch):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    monkeypatch.setattr(settings, "QUERY_TRACE_PATH", str(blocker / "trace.jsonl"))
+    monkeypatch.setattr(qa, "rag_pipeline", RAGPipeline(retriever=FixedRetriever("abc"), llm=replay.ReplayLLMClient({})))
+
+    async def query():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post("/api/query", json={"question": "Torque spec?"})
+
+    assert asyncio.run(query()).status_code == 200
+
+def test_replay_sends_recorded_request_options():
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"raw_context": []})
+
+    records = [
+        {"ts": 0, "question": "Torque spec?", "filters": {"include_context": True}},
+        {"ts": 0, "question": "Cure time?", "filters": {"include_context": False}},
+    ]
+
+    async def run_replay():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+            return await replay.replay(records, client, speed=0)
+
+    asyncio.run(run_replay())
+    assert sorted(sent, key=lambda b: b["question"]) == [
+        {"question": "Cure time?", "include_context": False},
+        {"question": "Torque spec?", "include_context": True},
+    ]